@@ -0,0 +1,236 @@
+# batch.py
+# Offline batch extraction: run the heuristics from extraction.py over many raw
+# messages (mbox archives, .eml files) without IMAP or Notion, and score the
+# results against a labeled gold set.
+#
+#   python batch.py archive.mbox [more.mbox | dir_of_emls | file.eml ...] \
+#       [--gold gold.jsonl] [--out results.csv] [--workers 4]
+#
+# Gold set: one JSON object per line with "message_id" and any of the labeled
+# fields company, role, status, url, applied_on (null = nothing should be
+# extracted) and tracked (true if the bot should upsert the email at all).
+import os, sys, csv, json, email, mailbox, argparse, functools
+from email.message import Message
+from concurrent.futures import ProcessPoolExecutor
+from dates import DEFAULT_DATE_ORDER, parse_date_order
+from extraction import extract_record
+
+RECORD_FIELDS = ["company", "role", "status", "url", "applied_on"]
+FIELDS = RECORD_FIELDS + ["tracked"]
+TIMED_STEPS = ["mime", "filter", "status", "company_role", "url", "date"]
+COLUMNS = (["message_id", "size", "skip_reason"] + FIELDS
+           + [f"time_{step}" for step in TIMED_STEPS] + ["error"])
+
+def _to_message(raw):
+    if isinstance(raw, Message):
+        return raw, len(raw.as_bytes())
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8", errors="replace")
+    return email.message_from_bytes(raw), len(raw)
+
+def _extract_row(raw, order=DEFAULT_DATE_ORDER, apply_filters=True):
+    row = {column: None for column in COLUMNS}
+    row["tracked"] = False
+    for step in TIMED_STEPS:
+        row[f"time_{step}"] = 0.0
+    try:
+        msg, size = _to_message(raw)
+        row["size"] = size
+        row["message_id"] = str(msg.get("Message-ID") or "").strip() or None
+        timings = {}
+        # no "today" fallback for applied_on, so scores don't depend on the day of the run
+        record = extract_record(msg, order=order, apply_filters=apply_filters, timings=timings,
+                                today_fallback=False)
+    except Exception as e:
+        # one malformed message shouldn't abort a run over a whole archive
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+    row["skip_reason"] = record["skip_reason"]
+    row["tracked"] = record["skip_reason"] is None
+    for field in RECORD_FIELDS:
+        row[field] = record[field]
+    for step in TIMED_STEPS:
+        row[f"time_{step}"] = timings.get(step, 0.0)
+    return row
+
+def extract_batch(messages, order=DEFAULT_DATE_ORDER, apply_filters=True, workers=1, chunksize=64):
+    """
+    Run the extraction pipeline over an iterable of raw messages
+
+    Args:
+        messages: raw RFC 822 bytes/str or email.message.Message objects
+        order: day/month order for ambiguous dates (see dates.parse_date_order)
+        apply_filters (bool): stop at the bot's skip filters like a live run does;
+            False extracts every field for every message
+        workers (int): number of processes; 1 runs in-process
+
+    Returns:
+        dict mapping each name in COLUMNS to a list with one entry per message.
+        Messages without a Message-ID get "#<index>" as their id. Messages that
+        fail to parse get an "error" and are not tracked; the rest of the batch
+        still runs.
+    """
+    extract = functools.partial(_extract_row, order=order, apply_filters=apply_filters)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(extract, messages, chunksize=chunksize))
+    else:
+        rows = [extract(raw) for raw in messages]
+
+    table = {column: [] for column in COLUMNS}
+    for index, row in enumerate(rows):
+        if row["message_id"] is None:
+            row["message_id"] = f"#{index}"
+        for column in COLUMNS:
+            table[column].append(row[column])
+    return table
+
+def iter_messages(paths):
+    """Yield raw message bytes from mbox files, .eml files and directories of .eml files"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(".eml"):
+                    with open(os.path.join(path, name), "rb") as fh:
+                        yield fh.read()
+        elif path.lower().endswith(".eml"):
+            with open(path, "rb") as fh:
+                yield fh.read()
+        else:
+            box = mailbox.mbox(path, create=False)
+            try:
+                for key in box.iterkeys():
+                    yield box.get_bytes(key)
+            finally:
+                box.close()
+
+def load_gold(path):
+    """Load a JSONL gold set into {message_id: labels}"""
+    gold = {}
+    with open(path, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            labels = json.loads(line)
+            if "message_id" not in labels:
+                raise ValueError(f"{path}:{line_no}: gold entry has no message_id")
+            gold[labels.pop("message_id").strip()] = labels
+    return gold
+
+def _normalize(value):
+    if value is None or value is False:
+        return None
+    if value is True:
+        return True
+    value = " ".join(str(value).split()).casefold()
+    return value or None
+
+def evaluate(table, gold, fields=FIELDS):
+    """
+    Score a result table against gold labels, per field
+
+    Only messages present in the gold set are scored, and only for the fields they label.
+    A non-empty prediction is a true positive when it equals the label (case and
+    whitespace insensitive). precision = tp / predicted, recall = tp / labeled.
+
+    Returns:
+        {field: {"tp", "predicted", "labeled", "precision", "recall", "f1"}}
+    """
+    scores = {field: {"tp": 0, "predicted": 0, "labeled": 0} for field in fields}
+    for index, message_id in enumerate(table["message_id"]):
+        labels = gold.get(message_id)
+        if labels is None:
+            continue
+        for field in fields:
+            if field not in labels:
+                continue
+            predicted = _normalize(table[field][index])
+            expected = _normalize(labels[field])
+            counts = scores[field]
+            if predicted is not None:
+                counts["predicted"] += 1
+            if expected is not None:
+                counts["labeled"] += 1
+                if predicted == expected:
+                    counts["tp"] += 1
+    for counts in scores.values():
+        precision = counts["tp"] / counts["predicted"] if counts["predicted"] else 0.0
+        recall = counts["tp"] / counts["labeled"] if counts["labeled"] else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        counts.update(precision=precision, recall=recall, f1=f1)
+    return scores
+
+def write_csv(table, fh):
+    writer = csv.writer(fh)
+    writer.writerow(COLUMNS)
+    writer.writerows(zip(*(table[column] for column in COLUMNS)))
+
+def print_report(table, scores=None, file=None):
+    _print = functools.partial(print, file=file or sys.stdout)
+    count = len(table["message_id"])
+    _print("\n" + "="*70)
+    _print("BATCH EXTRACTION SUMMARY")
+    _print("="*70)
+    _print(f"Messages: {count}")
+    skipped = {}
+    for reason in table["skip_reason"]:
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+    _print(f"✅ Would be upserted: {sum(table['tracked'])}")
+    for reason, n in sorted(skipped.items()):
+        _print(f"⏭️  Skipped ({reason}): {n}")
+    errors = sum(1 for error in table["error"] if error)
+    if errors:
+        _print(f"❌ Failed to extract: {errors}")
+    _print("\nTime per step (total / mean per message):")
+    for step in TIMED_STEPS:
+        total = sum(table[f"time_{step}"])
+        mean = total / count if count else 0.0
+        _print(f"  {step:<13} {total:9.3f}s  {mean * 1e6:9.1f} us")
+    if scores:
+        _print("\nAgainst gold set:")
+        _print(f"  {'field':<11} {'precision':>9} {'recall':>7} {'f1':>6}   tp/predicted/labeled")
+        for field, s in scores.items():
+            _print(f"  {field:<11} {s['precision']:9.3f} {s['recall']:7.3f} {s['f1']:6.3f}   "
+                   f"{s['tp']}/{s['predicted']}/{s['labeled']}")
+    _print("="*70 + "\n")
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run the email extraction heuristics over archived messages")
+    parser.add_argument("paths", nargs="+", help="mbox files, .eml files or directories of .eml files")
+    parser.add_argument("--gold", help="JSONL gold set to score the results against")
+    parser.add_argument("--out", help="Write the result table as CSV to this file ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument(
+        "--no-filters",
+        action="store_true",
+        help="Extract every field for every message instead of stopping at the bot's skip filters"
+    )
+    parser.add_argument(
+        "--date-order",
+        default=os.environ.get("DATE_ORDER", "US,EU"),
+        help="Day/month order for ambiguous dates, e.g. 'EU,US' (default: $DATE_ORDER or US,EU)"
+    )
+    args = parser.parse_args()
+
+    table = extract_batch(
+        iter_messages(args.paths),
+        order=parse_date_order(args.date_order),
+        apply_filters=not args.no_filters,
+        workers=args.workers,
+    )
+
+    if args.out == "-":
+        write_csv(table, sys.stdout)
+    elif args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as fh:
+            write_csv(table, fh)
+
+    scores = evaluate(table, load_gold(args.gold)) if args.gold else None
+    # keep the CSV on stdout clean
+    print_report(table, scores, file=sys.stderr if args.out == "-" else None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_notion_transport.py
+# Compare Notion client transports against a local stand-in for api.notion.com:
+# connections opened and latency per call for the query/create/update sequence
+# that upsert() makes for every email.
+#
+#   python benchmarks/bench_notion_transport.py [--upserts 200] [--threads 1] [--gap 0]
+#
+# The stand-in speaks plain HTTP/1.1, so the cost of a new connection here is only
+# the TCP handshake; against the real API each one also pays a TLS handshake.
+# Use --gap to idle between upserts the way IMAP fetches do in a real run.
+import os, sys, json, time, socket, threading, argparse, statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import httpx
+from notion_client import Client
+from notion_transport import build_notion_client
+
+DATABASE_ID = "bench-db"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive unless the client says otherwise
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # headers and body go out in separate writes; without this, Nagle + delayed ACK
+        # adds ~40ms to every response on a reused connection
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with StandInHandler.lock:
+            StandInHandler.connections += 1
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.path.endswith("/query"):
+            payload = {"object": "list", "results": [], "has_more": False}
+        else:
+            payload = {"object": "page", "id": "bench-page"}
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PATCH = _reply
+
+    def log_message(self, *args):
+        pass
+
+def upsert_calls(notion):
+    """The three calls upsert() makes; returns per-call latencies in seconds"""
+    latencies = []
+    for call in (
+        lambda: notion.databases.query(database_id=DATABASE_ID, filter={"property": "Company Name", "title": {"equals": "Acme"}}),
+        lambda: notion.pages.create(parent={"database_id": DATABASE_ID}, properties={}),
+        lambda: notion.pages.update(page_id="bench-page", properties={}),
+    ):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run(label, notion, upserts, threads, gap):
+    StandInHandler.connections = 0
+    latencies = []
+
+    def one(_):
+        result = upsert_calls(notion)
+        if gap:
+            time.sleep(gap)
+        return result
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for result in pool.map(one, range(upserts)):
+                latencies.extend(result)
+    else:
+        for i in range(upserts):
+            latencies.extend(one(i))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<28} {StandInHandler.connections:>6} conns  "
+          f"{statistics.mean(latencies) * 1e3:7.3f} ms/call mean  {p95 * 1e3:7.3f} ms p95  {wall:6.2f}s wall")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Notion transports against a local stand-in server")
+    parser.add_argument("--upserts", type=int, default=200, help="Upserts (3 calls each) per transport")
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent upserts sharing one client")
+    parser.add_argument("--gap", type=float, default=0.0, help="Seconds to idle after each upsert")
+    parser.add_argument("--pool-size", type=int, default=10)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Stand-in at {base_url}: {args.upserts} upserts x 3 calls, {args.threads} thread(s), {args.gap}s gap")
+
+    no_keepalive = httpx.Client(limits=httpx.Limits(max_keepalive_connections=0))
+    transports = [
+        ("new connection per call", Client(auth="bench", base_url=base_url, client=no_keepalive)),
+        ("notion-client default", Client(auth="bench", base_url=base_url)),
+        ("pooled (notion_transport)", build_notion_client("bench", base_url=base_url, pool_size=args.pool_size)),
+    ]
+    for label, notion in transports:
+        run(label, notion, args.upserts, args.threads, args.gap)
+        notion.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
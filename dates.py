@@ -0,0 +1,137 @@
+# dates.py
+# Date extraction engine used by bot.py: one combined regex finds every
+# candidate date in a pass, precompiled handlers turn each match into a
+# datetime.date without strptime, and an ordered policy settles US vs EU
+# day/month ambiguity.
+import re, datetime, functools
+from email.utils import parsedate_to_datetime
+
+# Application dates older than this are treated as noise (old receipts, footers...)
+MIN_DATE = datetime.date(2020, 1, 1)
+
+# Day/month conventions tried in order for ambiguous numeric dates like 05/06/2024
+DEFAULT_DATE_ORDER = ("US", "EU")
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_MONTH_NAMES = {name[:3].lower(): name.lower() for name in [
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+]}
+
+# Context words that make a date more likely to be the application date.
+# Lower rank wins; dates without context get NO_CONTEXT_RANK.
+CONTEXT_RANKS = {
+    "applied": 0,
+    "application": 1,
+    "submitted": 2,
+    "received": 3,
+}
+NO_CONTEXT_RANK = len(CONTEXT_RANKS)
+CONTEXT_HINT_RX = re.compile(r"applied\s+on|application\s+date|submitted|received")
+
+# Matched against lower-cased text: case-sensitive patterns are much cheaper in sre than re.I.
+# The context branch is optional; the (?=\d) branch lets bare dates match with no prefix.
+DATE_RX = re.compile(r"""
+    (?:(?P<ctx>applied\s+on|application\s+date|submitted(?:\s+on)?|received(?:\s+on)?)[:\s]+|(?=\d))
+    (?<!\d)
+    (?:
+        # numeric: 5/6/2024, 05-06-24 (same separator on both sides)
+        (?P<a>\d{1,2})(?P<sep>[/-])(?P<b>\d{1,2})(?P=sep)(?P<y>\d{2}(?:\d{2})?)
+      |
+        # day + month name: 5 sep 2024, 12 september 2024
+        (?P<nd>\d{1,2})\s+(?P<mon>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(?P<mrest>[a-z]*)\.?\s+(?P<ny>\d{4})
+    )
+    (?!\d)
+""", re.X)
+
+def parse_date_order(value):
+    """Turn 'EU,US' style config into a date-order tuple, falling back to the default"""
+    order = tuple(part.strip().upper() for part in (value or "").split(",") if part.strip())
+    if not order or any(part not in ("US", "EU") for part in order):
+        return DEFAULT_DATE_ORDER
+    return order
+
+def _expand_year(text):
+    year = int(text)
+    if len(text) == 2:
+        # same pivot as strptime's %y
+        year += 1900 if year >= 69 else 2000
+    return year
+
+def _numeric_handler(m, order):
+    a, b, year = int(m.group("a")), int(m.group("b")), _expand_year(m.group("y"))
+    for convention in order:
+        if convention == "US":
+            yield year, a, b
+        else:
+            yield year, b, a
+
+def _named_handler(m, order):
+    mon = m.group("mon")
+    rest = m.group("mrest")
+    # accept the abbreviation or any prefix of the full month name ("Sept"), nothing else
+    if rest and not _MONTH_NAMES[mon].startswith(mon + rest):
+        return
+    yield int(m.group("ny")), MONTHS[mon], int(m.group("nd"))
+
+def _resolve(m, order, today, numeric_only):
+    """Return the first valid in-range date for a match, honouring the ambiguity policy"""
+    if m.group("a") is not None:
+        candidates = _numeric_handler(m, order)
+    elif numeric_only:
+        return None
+    else:
+        candidates = _named_handler(m, order)
+    for year, month, day in candidates:
+        try:
+            parsed = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        if MIN_DATE <= parsed <= today:
+            return parsed
+    return None
+
+def _context_rank(m):
+    ctx = m.group("ctx")
+    if not ctx:
+        return NO_CONTEXT_RANK
+    return CONTEXT_RANKS[ctx.split()[0]]
+
+def best_date(text, order=DEFAULT_DATE_ORDER, numeric_only=False, today=None):
+    """Return the best-ranked date in text (earliest wins on ties), or None"""
+    if not text:
+        return None
+    today = today or datetime.date.today()
+    lowered = text.lower()
+    # Without any context word the first valid date is the answer, so stop scanning there
+    has_context = CONTEXT_HINT_RX.search(lowered) is not None
+    best = None
+    best_rank = NO_CONTEXT_RANK + 1
+    for m in DATE_RX.finditer(lowered):
+        rank = _context_rank(m)
+        if rank >= best_rank:
+            continue
+        parsed = _resolve(m, order, today, numeric_only)
+        if parsed:
+            best, best_rank = parsed, rank
+            if rank == 0 or not has_context:
+                break
+    return best
+
+def parse_header_date(value):
+    """Parse an RFC 2822 Date header (e.g. 'Thu, 5 Sep 2024 10:30:00 -0700') into a date, cached"""
+    if not value:
+        return None
+    # msg.get() returns an unhashable email.header.Header when the header has 8-bit bytes
+    return _parse_header_date(str(value))
+
+@functools.lru_cache(maxsize=4096)
+def _parse_header_date(value):
+    try:
+        return parsedate_to_datetime(value).date()
+    except (TypeError, ValueError, IndexError):
+        return None
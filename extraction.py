@@ -0,0 +1,495 @@
+# extraction.py
+# Email parsing heuristics shared by bot.py (live IMAP runs) and batch.py (offline runs).
+# Nothing here talks to Notion or IMAP, so it can be imported without credentials.
+import re, html, time, datetime, functools
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, unquote_plus
+from email.header import decode_header, make_header
+from dates import DEFAULT_DATE_ORDER, best_date, parse_header_date
+
+# --- helpers ---
+def get_text_from_message(msg):
+    """Return best-effort plain text from an email.message.Message."""
+    # Prefer text/plain
+    if msg.is_multipart():
+        for part in msg.walk():
+            ctype = part.get_content_type()
+            if ctype == "text/plain":
+                try:
+                    return part.get_payload(decode=True).decode(errors="ignore")
+                except Exception:
+                    pass
+        # fallback to first text/html
+        for part in msg.walk():
+            if part.get_content_type() == "text/html":
+                try:
+                    html = part.get_payload(decode=True).decode(errors="ignore")
+                    # very light html-to-text fallback
+                    text = re.sub(r"<[^>]+>", " ", html)
+                    text = re.sub(r"\s+", " ", text)
+                    return text.strip()
+                except Exception:
+                    pass
+    else:
+        ctype = msg.get_content_type()
+        try:
+            payload = msg.get_payload(decode=True)
+            if payload is None:
+                return ""
+            text = payload.decode(errors="ignore")
+            if ctype == "text/html":
+                text = re.sub(r"<[^>]+>", " ", text)
+                text = re.sub(r"\s+", " ", text)
+            return text
+        except Exception:
+            return ""
+    return ""
+
+# --- subject lines to status mapping ---
+SUBJECT_RULES = [
+    # Rejection patterns (check first to avoid false positives)
+    (re.compile(r"not move forward|reject|regret|declined|unsuccessful|not selected|not chosen|not proceed", re.I), "Rejected"),
+    
+    # Offer patterns
+    (re.compile(r"offer|congratulations.*offer|we.*pleased.*offer", re.I), "Offer Received"),
+    
+    # Interview patterns
+    (re.compile(r"interview.*scheduled|phone screen|assessment.*scheduled|coding challenge.*scheduled|interview.*invite", re.I), "Interview Scheduled"),
+    (re.compile(r"interview|phone screen|assessment|coding challenge|technical interview|behavioral interview", re.I), "Interview Scheduled"),
+    
+    # Application confirmation patterns (most common for job application emails)
+    (re.compile(r"we.*received.*your.*application|thank.*you.*for.*your.*application|application.*received|we.*received.*your.*job.*application|thank.*you.*for.*your.*online.*submission|we.*received.*your.*submission|application.*submitted|your.*application.*has.*been.*received", re.I), "Applied"),
+    
+    # In progress patterns
+    (re.compile(r"next steps|moving forward|under review|in review|being considered|application.*review", re.I), "In Progress"),
+]
+
+def parse_company_and_role(subject, body, sender=""):
+    """Extract company and role from job application confirmation emails"""
+    company = None
+    role = None
+    
+    # Clean up subject
+    clean_subject = re.sub(r"^(re:|fwd?:|fw:)\s*", "", subject, flags=re.I).strip()
+    clean_subject = re.sub(r"\s*\[.*?\]\s*$", "", clean_subject).strip()
+    
+    # Method 1: Extract from sender email domain (most reliable for job apps)
+    if sender:
+        # Handle common job application email patterns
+        sender_lower = sender.lower()
+        
+        # Direct company emails (e.g., "JPMorgan Chase & Co.")
+        if "& co" in sender_lower or "corp" in sender_lower or "inc" in sender_lower:
+            company = sender.title()
+            # Clean up common suffixes
+            company = re.sub(r"\s+(inc|llc|ltd|corp|corporation|company|& co\.?)$", "", company, flags=re.I)
+        else:
+            # Extract from domain
+            domain_match = re.search(r"@([^.]+)\.", sender_lower)
+            if domain_match:
+                domain = domain_match.group(1)
+                # Skip generic domains
+                if domain not in ["gmail", "yahoo", "hotmail", "outlook", "linkedin", "indeed", "glassdoor", "hubspot", "mailchimp", "myworkday", "workday"]:
+                    company = domain.title()
+                    # Handle common company name variations
+                    company = re.sub(r"noreply|no-reply|careers|jobs|hr|talent", "", company, flags=re.I).strip()
+                    if company:
+                        company = company.title()
+                        
+                        # Special handling for known company domains
+                        company_mappings = {
+                            "hewlett": "Hewlett-Packard Enterprise",
+                            "hpe": "Hewlett-Packard Enterprise", 
+                            "hp": "Hewlett-Packard Enterprise",
+                            "jpmorgan": "JPMorgan Chase & Co.",
+                            "chase": "JPMorgan Chase & Co.",
+                            "salesforce": "Salesforce",
+                            "google": "Google",
+                            "microsoft": "Microsoft",
+                            "amazon": "Amazon",
+                            "meta": "Meta",
+                            "facebook": "Meta",
+                            "apple": "Apple",
+                            "netflix": "Netflix",
+                            "uber": "Uber",
+                            "airbnb": "Airbnb",
+                            "spotify": "Spotify",
+                            "twitter": "Twitter",
+                            "x": "X (formerly Twitter)",
+                            "linkedin": "LinkedIn",
+                            "adobe": "Adobe",
+                            "oracle": "Oracle",
+                            "ibm": "IBM",
+                            "intel": "Intel",
+                            "nvidia": "NVIDIA",
+                            "tesla": "Tesla",
+                            "spacex": "SpaceX",
+                            "openai": "OpenAI",
+                            "anthropic": "Anthropic",
+                            "stripe": "Stripe",
+                            "square": "Square",
+                            "paypal": "PayPal",
+                            "visa": "Visa",
+                            "mastercard": "Mastercard",
+                            "goldman": "Goldman Sachs",
+                            "morgan": "Morgan Stanley",
+                            "wells": "Wells Fargo",
+                            "bankofamerica": "Bank of America",
+                            "citi": "Citigroup",
+                            "pepsi": "PepsiCo",
+                            "coca": "Coca-Cola",
+                            "nike": "Nike",
+                            "adidas": "Adidas",
+                            "starbucks": "Starbucks",
+                            "mcdonalds": "McDonald's",
+                            "walmart": "Walmart",
+                            "target": "Target",
+                            "costco": "Costco",
+                            "home": "Home Depot",
+                            "lowes": "Lowe's",
+                            "best": "Best Buy",
+                            "dell": "Dell",
+                            "cisco": "Cisco",
+                            "vmware": "VMware",
+                            "redhat": "Red Hat",
+                            "dropbox": "Dropbox",
+                            "box": "Box",
+                            "slack": "Slack",
+                            "zoom": "Zoom",
+                            "figma": "Figma",
+                            "canva": "Canva",
+                            "notion": "Notion",
+                            "atlassian": "Atlassian",
+                            "jira": "Atlassian",
+                            "confluence": "Atlassian",
+                            "trello": "Trello",
+                            "asana": "Asana",
+                            "monday": "Monday.com",
+                            "airtable": "Airtable",
+                            "zapier": "Zapier",
+                            "hubspot": "HubSpot",
+                            "salesforce": "Salesforce",
+                            "pipedrive": "Pipedrive",
+                            "zendesk": "Zendesk",
+                            "freshworks": "Freshworks",
+                            "servicenow": "ServiceNow",
+                            "workday": "Workday",
+                            "bamboohr": "BambooHR",
+                            "greenhouse": "Greenhouse",
+                            "lever": "Lever",
+                            "smartrecruiters": "SmartRecruiters",
+                            "taleo": "Oracle Taleo",
+                            "icims": "iCIMS",
+                            "jobvite": "Jobvite",
+                            "ats": "ATS System"
+                        }
+                        
+                        # Check if we have a mapping for this domain
+                        domain_lower = domain.lower()
+                        for key, full_name in company_mappings.items():
+                            if key in domain_lower:
+                                company = full_name
+                                break
+    
+    # Method 2: Extract from email body (look for company names in application confirmations)
+    if not company:
+        company_patterns = [
+            r"([A-Z][a-zA-Z\s&\.]+?)\s+team",
+            r"([A-Z][a-zA-Z\s&\.]+?)\s+talent",
+            r"([A-Z][a-zA-Z\s&\.]+?)\s+recruiting",
+            r"([A-Z][a-zA-Z\s&\.]+?)\s+hr",
+            r"at\s+([A-Z][a-zA-Z\s&\.]+?)(?:\s|$|,|\.|!)",
+            r"from\s+([A-Z][a-zA-Z\s&\.]+?)(?:\s|$|,|\.|!)",
+            r"([A-Z][a-zA-Z\s&\.]+?)\s+and\s+co",
+            r"([A-Z][a-zA-Z\s&\.]+?)\s+corporation"
+        ]
+        
+        for pattern in company_patterns:
+            match = re.search(pattern, body, re.I)
+            if match:
+                potential_company = match.group(1).strip()
+                # Filter out common false positives
+                if (len(potential_company) > 2 and 
+                    potential_company.lower() not in ["the", "a", "an", "and", "or", "but", "our", "your", "this", "that", "warm", "hello"] and
+                    not re.search(r"^(great|good|wonderful|amazing|thank)", potential_company, re.I)):
+                    company = potential_company
+                    break
+    
+    # Method 3: Extract role from subject line (common in job application emails)
+    role_patterns = [
+        r"for the\s+([A-Z][a-zA-Z\s]+?(?:Engineer|Developer|Analyst|Manager|Intern|Associate|Specialist|Coordinator|Assistant|Consultant|Designer|Scientist|Program))",
+        r"([A-Z][a-zA-Z\s]+?(?:Engineer|Developer|Analyst|Manager|Intern|Associate|Specialist|Coordinator|Assistant|Consultant|Designer|Scientist|Program))\s+position",
+        r"([A-Z][a-zA-Z\s]+?(?:Engineer|Developer|Analyst|Manager|Intern|Associate|Specialist|Coordinator|Assistant|Consultant|Designer|Scientist|Program))\s+intern",
+        r"([A-Z][a-zA-Z\s]+?(?:Engineer|Developer|Analyst|Manager|Intern|Associate|Specialist|Coordinator|Assistant|Consultant|Designer|Scientist|Program))\s+role"
+    ]
+    
+    for pattern in role_patterns:
+        match = re.search(pattern, clean_subject, re.I)
+        if match:
+            potential_role = match.group(1).strip()
+            if len(potential_role) > 3 and len(potential_role) < 100:
+                role = potential_role
+                break
+    
+    # Method 4: Extract role from email body
+    if not role:
+        body_role_patterns = [
+            r"Position:\s*([^\n\r,]+)",
+            r"Role:\s*([^\n\r,]+)",
+            r"Job Title:\s*([^\n\r,]+)",
+            r"for the\s+([A-Z][a-zA-Z\s]+?)(?:\s|$|,|\.|!)",
+            r"([A-Z][a-zA-Z\s]+?(?:Engineer|Developer|Analyst|Manager|Intern|Associate|Specialist|Coordinator|Assistant|Consultant|Designer|Scientist|Program))"
+        ]
+        
+        for pattern in body_role_patterns:
+            match = re.search(pattern, body, re.I)
+            if match:
+                potential_role = match.group(1).strip()
+                if len(potential_role) > 3 and len(potential_role) < 100:
+                    role = potential_role
+                    break
+    
+    # Clean up extracted values
+    if company:
+        company = re.sub(r"\s+", " ", company).strip()
+        # Remove common suffixes
+        company = re.sub(r"\s+(inc|llc|ltd|corp|corporation|company|& co\.?)$", "", company, flags=re.I)
+    
+    if role:
+        role = re.sub(r"\s+", " ", role).strip()
+        # Remove common prefixes/suffixes
+        role = re.sub(r"^(the|a|an)\s+", "", role, flags=re.I)
+        role = re.sub(r"\s+(position|role|job)$", "", role, flags=re.I)
+    
+    return company, role
+
+# --- application URL extraction ---
+URL_RX = re.compile(r"https?://[^\s<>\"']+")
+
+# Prioritize URLs that look like job application portals
+JOB_INDICATORS = [
+    "careers", "jobs", "apply", "application", "hiring", "recruiting",
+    "workday", "greenhouse", "lever", "bamboohr", "smartrecruiters",
+    "taleo", "icims", "jobvite", "ats", "portal"
+]
+# Lower score for generic domains
+GENERIC_DOMAINS = ["googleapis.com", "fonts.googleapis.com", "linkedin.com", "facebook.com", "twitter.com"]
+
+# Zero-width lookaheads so overlapping hits are all found (fonts.googleapis.com also counts as googleapis.com)
+JOB_INDICATOR_RX = re.compile(r"(?=(%s))" % "|".join(map(re.escape, JOB_INDICATORS)))
+GENERIC_DOMAIN_RX = re.compile(r"(?=(%s))" % "|".join(map(re.escape, GENERIC_DOMAINS)))
+
+# Query parameters that only carry click tracking; names ending in * are prefixes
+TRACKING_PARAMS = ["utm_*", "gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_hsenc", "_hsmi",
+                   "mkt_tok", "trk", "trkemail", "lipi", "midtoken", "midsig"]
+
+# Redirect/safe-link wrappers: host suffix -> query parameter holding the real target
+REDIRECT_WRAPPERS = {
+    "safelinks.protection.outlook.com": "url",
+    "google.com": "q",        # https://www.google.com/url?q=...
+    "l.facebook.com": "u",
+    "l.instagram.com": "u",
+}
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return any(name.startswith(p[:-1]) if p.endswith("*") else name == p for p in TRACKING_PARAMS)
+
+def canonicalize_url(url):
+    """
+    Unwrap known redirect links and drop tracking query parameters
+
+    URLs urllib can't parse (e.g. a broken IPv6 host) are returned as found:
+
+    >>> canonicalize_url("http://[broken")
+    'http://[broken'
+    >>> extract_application_url("see http://[broken link", "Thanks")
+    'http://[broken'
+
+    Query strings are only rewritten when a tracking parameter is dropped:
+
+    >>> canonicalize_url("https://acme.com/apply?next=/jobs/1&token")
+    'https://acme.com/apply?next=/jobs/1&token'
+    >>> canonicalize_url("https://acme.com/apply?next=/jobs/1&utm_source=mail&token")
+    'https://acme.com/apply?next=/jobs/1&token'
+    """
+    url = html.unescape(url).rstrip(".,;:!?)]}")
+    try:
+        return _canonicalize(url)
+    except ValueError:
+        return url
+
+def _canonicalize(url):
+    for _ in range(3):  # wrappers can be nested (safe link around a google redirect)
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        param = next((p for suffix, p in REDIRECT_WRAPPERS.items()
+                      if host == suffix or host.endswith("." + suffix)), None)
+        if not param:
+            break
+        target = dict(parse_qsl(parts.query)).get(param, "")
+        if not URL_RX.match(target):
+            break
+        url = target
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    # Filter the raw segments so kept parameters keep their original encoding,
+    # and leave the URL untouched when there is nothing to drop
+    segments = parts.query.split("&")
+    kept = [seg for seg in segments if not _is_tracking_param(unquote_plus(seg.split("=", 1)[0]))]
+    if len(kept) == len(segments):
+        return url
+    return urlunsplit(parts._replace(query="&".join(kept)))
+
+@functools.lru_cache(maxsize=8192)
+def score_url(raw_url):
+    """Return (score, canonical_url) for a URL; cached because the same links repeat across emails"""
+    url = canonicalize_url(raw_url)
+    url_lower = url.lower()
+    score = 0
+    # Higher score for job-related domains/keywords (each distinct indicator counts once)
+    score += 10 * len({m.group(1) for m in JOB_INDICATOR_RX.finditer(url_lower)})
+    score -= 20 * len({m.group(1) for m in GENERIC_DOMAIN_RX.finditer(url_lower)})
+    # Prefer shorter URLs (less likely to be tracking links)
+    if len(url) < 100:
+        score += 5
+    return score, url
+
+def extract_application_url(body, subject):
+    """Extract the most relevant application URL from email content"""
+    # Stream URLs from the body and then the subject; keep the first best-scoring one
+    best_score, best_url = None, None
+    for text in (body, subject):
+        for m in URL_RX.finditer(text):
+            score, url = score_url(m.group(0))
+            if best_score is None or score > best_score:
+                best_score, best_url = score, url
+    # Return the best URL even if its score is low
+    return best_url
+
+def extract_application_date(msg, subject, body, order=DEFAULT_DATE_ORDER):
+    """Extract the actual application date from email content"""
+    # Body first: numeric dates only, context-tagged ones ("applied on ...") win over bare dates
+    parsed_date = best_date(body, order=order, numeric_only=True)
+    if parsed_date:
+        return parsed_date.isoformat()
+    
+    # Then the subject line, which may also spell the month out ("5 Sep 2024")
+    parsed_date = best_date(subject, order=order)
+    if parsed_date:
+        return parsed_date.isoformat()
+    
+    # For confirmation emails, use email date as it's likely close to application date
+    if any(word in subject.lower() for word in ["thanks", "received", "application", "confirmation", "submitted"]):
+        # For application confirmations, the email date is usually the same day or next day
+        # So we can use it as the application date
+        email_date = parse_header_date(msg.get("Date", ""))
+        if email_date:
+            return email_date.isoformat()
+    
+    return None
+
+def derive_status(subject, body):
+    for rx, status in SUBJECT_RULES:
+        if rx.search(subject) or rx.search(body):
+            return status
+    return "Not Applied Yet"  # default if nothing matches
+
+
+# ONLY process emails that are clearly job application confirmations
+APPLICATION_CONFIRMATIONS = [
+    re.compile(r"we.*received.*your.*application"),
+    re.compile(r"thank.*you.*for.*your.*application"),
+    re.compile(r"application.*received"),
+    re.compile(r"we.*received.*your.*job.*application"),
+    re.compile(r"thank.*you.*for.*your.*online.*submission"),
+    re.compile(r"we.*received.*your.*submission"),
+    re.compile(r"application.*submitted"),
+    re.compile(r"your.*application.*has.*been.*received"),
+]
+
+# Sender/subject words that mark an email as not job related even if it "confirms" something
+NON_JOB_KEYWORDS = [
+    "linkedin", "property", "rent", "payment", "maintenance", "verification",
+    "security", "deadline", "reminder", "notification", "social", "reacted",
+    "externship", "admissions", "course", "class", "petscreening"
+]
+
+PLACEHOLDER_COMPANIES = ["unknown", "unknown company", "our", "your", "this", "that", "the"]
+
+def is_application_confirmation(subject_lower, body_lower):
+    return any(rx.search(subject_lower) or rx.search(body_lower) for rx in APPLICATION_CONFIRMATIONS)
+
+def has_non_job_keywords(sender_lower, subject_lower):
+    return any(word in sender_lower or word in subject_lower for word in NON_JOB_KEYWORDS)
+
+def extract_record(msg, order=DEFAULT_DATE_ORDER, apply_filters=True, timings=None, today_fallback=True):
+    """
+    Run the full extraction pipeline over one email.message.Message
+    
+    Returns a dict with subject, sender, skip_reason and the extracted company, role,
+    status, url and applied_on. skip_reason is None when the email would be upserted,
+    otherwise "not_confirmation", "non_job_keywords" or "no_company". With
+    apply_filters=False every field is extracted regardless of the filters.
+    today_fallback=False leaves applied_on as None instead of using today's date
+    when neither the email nor its Date header gives a usable date (offline runs).
+    If a timings dict is passed, seconds spent per step are added to it.
+    """
+    clock = time.perf_counter
+    t0 = clock()
+    subject = str(make_header(decode_header(msg.get("Subject") or "")))
+    sender = msg.get("From", "").lower()
+    body = get_text_from_message(msg)
+    t1 = clock()
+    
+    record = {"subject": subject, "sender": sender, "skip_reason": None,
+              "company": None, "role": None, "status": None, "url": None, "applied_on": None}
+    
+    subject_lower = subject.lower()
+    if not is_application_confirmation(subject_lower, body.lower()):
+        record["skip_reason"] = "not_confirmation"
+    elif has_non_job_keywords(sender, subject_lower):
+        record["skip_reason"] = "non_job_keywords"
+    t2 = clock()
+    if timings is not None:
+        timings["mime"] = timings.get("mime", 0.0) + (t1 - t0)
+        timings["filter"] = timings.get("filter", 0.0) + (t2 - t1)
+    if record["skip_reason"] and apply_filters:
+        return record
+    
+    status = derive_status(subject, body)
+    t3 = clock()
+    company, role = parse_company_and_role(subject, body, sender)
+    t4 = clock()
+    record.update(status=status, company=company, role=role)
+    if timings is not None:
+        timings["status"] = timings.get("status", 0.0) + (t3 - t2)
+        timings["company_role"] = timings.get("company_role", 0.0) + (t4 - t3)
+    
+    # Skip if we couldn't extract a meaningful company name
+    if not record["skip_reason"] and (not company or company.lower() in PLACEHOLDER_COMPANIES):
+        record["skip_reason"] = "no_company"
+        if apply_filters:
+            return record
+    
+    # Extract application URL - prioritize job-related URLs
+    url = extract_application_url(body, subject)
+    t5 = clock()
+    
+    # Extract actual application date
+    applied_on = extract_application_date(msg, subject, body, order=order)
+    if not applied_on and status in ("Applied", "Not Applied Yet"):
+        # For application confirmations, use email date as it's likely close to application date
+        # (parse_header_date is cached, so this reuses the parse from extract_application_date)
+        email_date = parse_header_date(msg.get("Date", ""))
+        # Don't use future dates
+        if email_date and email_date <= datetime.date.today():
+            applied_on = email_date.isoformat()
+        elif today_fallback:
+            applied_on = datetime.date.today().isoformat()
+    t6 = clock()
+    record.update(url=url, applied_on=applied_on)
+    if timings is not None:
+        timings["url"] = timings.get("url", 0.0) + (t5 - t4)
+        timings["date"] = timings.get("date", 0.0) + (t6 - t5)
+    return record
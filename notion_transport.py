@@ -0,0 +1,62 @@
+# notion_transport.py
+# One explicitly configured, pooled HTTP transport for every Notion API call.
+#
+# notion-client builds a bare httpx.Client by default: 5 second keep-alive (so the
+# connection is usually gone again after fetching the next email over IMAP), a
+# single 60 second timeout for everything, and HTTP/1.1 only. Here the pool size,
+# keep-alive expiry and connect/read timeouts are explicit, and HTTP/2 can be
+# switched on so concurrent calls share one multiplexed connection.
+import httpx
+from notion_client import Client
+
+DEFAULT_POOL_SIZE        = 10
+DEFAULT_KEEPALIVE_EXPIRY = 120.0  # seconds an idle connection is kept for reuse
+DEFAULT_TIMEOUT          = 30.0   # seconds to wait for a response (read/write/pool)
+DEFAULT_CONNECT_TIMEOUT  = 10.0   # seconds to wait for TCP + TLS setup
+
+def http2_available():
+    """HTTP/2 in httpx needs the optional 'h2' package (pip install 'httpx[http2]')"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def make_timeout(timeout=DEFAULT_TIMEOUT, connect_timeout=DEFAULT_CONNECT_TIMEOUT):
+    return httpx.Timeout(timeout, connect=connect_timeout)
+
+def build_http_client(pool_size=DEFAULT_POOL_SIZE, keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+                      timeout=DEFAULT_TIMEOUT, connect_timeout=DEFAULT_CONNECT_TIMEOUT, http2=False):
+    """Build the pooled keep-alive httpx.Client used for Notion calls"""
+    if http2 and not http2_available():
+        print("WARNING: HTTP/2 requested but the 'h2' package is not installed (pip install 'httpx[http2]'), using HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.Client(limits=limits, timeout=make_timeout(timeout, connect_timeout), http2=http2)
+
+def build_notion_client(auth, base_url=None, http_client=None, **transport_options):
+    """
+    Create a notion_client.Client on top of a pooled transport
+
+    Args:
+        auth (str): Notion integration token
+        base_url (str): API root, e.g. a local stand-in server; defaults to api.notion.com
+        http_client (httpx.Client): reuse an existing transport instead of building one
+        **transport_options: pool_size, keepalive_expiry, timeout, connect_timeout, http2
+    """
+    if http_client is None:
+        http_client = build_http_client(**transport_options)
+    timeout = transport_options.get("timeout", DEFAULT_TIMEOUT)
+    connect_timeout = transport_options.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+    options = {"auth": auth, "timeout_ms": int(timeout * 1000)}
+    if base_url:
+        options["base_url"] = base_url.rstrip("/")
+    notion = Client(options, client=http_client)
+    # notion-client replaces the timeout with a single value when it adopts the
+    # client; put the separate connect timeout back
+    http_client.timeout = make_timeout(timeout, connect_timeout)
+    return notion
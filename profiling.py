@@ -0,0 +1,110 @@
+# profiling.py
+# Profiling hooks for slow runs (bot.py --profile): a cProfile or sampling profiler
+# around the whole run, plus per-message costs by category so the emails that
+# dominate runtime can be picked out and fed back into the rules.
+import sys, time, pstats, cProfile, threading, collections
+
+# Per-message cost categories filled in by sync.fetch_recent_emails();
+# "throttle" is time spent waiting on the Notion rate limiter
+CATEGORIES = ["network", "throttle", "mime", "regex"]
+
+class MessageCosts:
+    """Collects seconds spent per category for every message in a run"""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, uid, message_id, size, costs):
+        row = {"uid": uid, "message_id": message_id, "size": size}
+        for category in CATEGORIES:
+            row[category] = costs.get(category, 0.0)
+        row["total"] = sum(row[category] for category in CATEGORIES)
+        # tag each message with the category that dominated it
+        row["hottest"] = max(CATEGORIES, key=lambda category: row[category])
+        self.rows.append(row)
+
+    def report(self, top=10, log=print):
+        if not self.rows:
+            log("No messages were profiled")
+            return
+        total = sum(row["total"] for row in self.rows)
+        log("\n" + "="*70)
+        log("PER-MESSAGE COST")
+        log("="*70)
+        log(f"Messages: {len(self.rows)}, {total:.2f}s total")
+        for category in CATEGORIES:
+            spent = sum(row[category] for row in self.rows)
+            hottest_in = sum(1 for row in self.rows if row["hottest"] == category)
+            share = spent / total * 100 if total else 0.0
+            log(f"  {category:<8} {spent:8.2f}s  {share:5.1f}%  hottest in {hottest_in} message(s)")
+        log(f"\nSlowest {min(top, len(self.rows))} messages:")
+        for row in sorted(self.rows, key=lambda r: r["total"], reverse=True)[:top]:
+            log(f"  {row['total'] * 1e3:9.1f} ms  {row['hottest']:<8} {row['size']:>9,} B  "
+                f"uid={row['uid']}  {row['message_id'] or '(no Message-ID)'}")
+        log("="*70 + "\n")
+
+class StackSampler:
+    """
+    Minimal sampling profiler: a background thread records the target thread's
+    stack every `interval` seconds and writes them in the collapsed format read by
+    flamegraph.pl, speedscope and inferno ("frame;frame;frame count" per line)
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+def run_profiled(fn, path, profiler="cprofile", interval=0.005, top=15, log=print):
+    """
+    Run fn() under a profiler and write the result to path
+
+    profiler="cprofile" writes a pstats file (python -m pstats, snakeviz, flameprof);
+    profiler="sample" writes collapsed stacks for flamegraph tools.
+    """
+    start = time.perf_counter()
+    if profiler == "sample":
+        sampler = StackSampler(interval=interval)
+        sampler.start()
+        try:
+            result = fn()
+        finally:
+            sampler.stop()
+            sampler.dump(path)
+        log(f"PROFILE: {sum(sampler.samples.values())} samples over {time.perf_counter() - start:.2f}s written to {path}")
+        return result
+
+    prof = cProfile.Profile()
+    try:
+        result = prof.runcall(fn)
+    finally:
+        prof.dump_stats(path)
+        log(f"PROFILE: pstats for {time.perf_counter() - start:.2f}s run written to {path}")
+        stats = pstats.Stats(prof, stream=sys.stdout)
+        stats.sort_stats("cumulative").print_stats(top)
+    return result
@@ -0,0 +1,174 @@
+# runner.py
+# Multi-tenant runner: sync many people's mailboxes into their own Notion databases
+# from one process, sharing a worker pool.
+#
+#   python runner.py tenants.json [--days 7] [--workers 4] [--report metrics.json]
+#
+# tenants.json:
+#   {
+#     "workers": 4,
+#     "days": 7,
+#     "state_dir": ".state",
+#     "tenants": [
+#       {"name": "alice",
+#        "notion_token": "$ALICE_NOTION_TOKEN", "notion_database_id": "$ALICE_NOTION_DATABASE_ID",
+#        "imap_user": "alice@gmail.com", "imap_pass": "$ALICE_IMAP_PASS"},
+#       {"name": "bob",
+#        "notion_token": "$BOB_NOTION_TOKEN", "notion_database_id": "$BOB_NOTION_DATABASE_ID",
+#        "imap_user": "bob@gmail.com", "imap_pass": "$BOB_IMAP_PASS", "checkpoint": false}
+#     ]
+#   }
+#
+# "workers" is how many tenants are processed at the same time, "days" the default
+# lookback and "state_dir" where per-tenant IMAP checkpoints are kept.
+# String values starting with "$" are read from that environment variable, so
+# secrets can stay in GitHub Secrets. Optional per-tenant keys: imap_host,
+# imap_folder, days, date_order, rate_limit, rate_burst, pool_size,
+# checkpoint (default true).
+import os, re, sys, json, time, argparse, traceback
+from concurrent.futures import ThreadPoolExecutor
+import sync
+from dates import parse_date_order
+from notion_transport import build_notion_client
+
+REQUIRED_KEYS = ["name", "notion_token", "notion_database_id", "imap_user", "imap_pass"]
+
+# tenant names become checkpoint file names, so no path separators or leading dots
+NAME_RX = re.compile(r"[\w@-][\w.@-]*")
+
+def _resolve(value, tenant_name, key):
+    if isinstance(value, str) and value.startswith("$"):
+        var = value[1:].strip("{}")
+        if var not in os.environ:
+            raise ValueError(f"tenant '{tenant_name}': {key} refers to unset environment variable {var}")
+        return os.environ[var]
+    return value
+
+def _flag(value):
+    # "$VAR" values arrive as strings, and "false" would otherwise be truthy
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(value)
+
+def load_config(path):
+    """
+    Load a tenants config file and check that every tenant has a unique name
+
+    $ENV references and the other keys are checked per tenant by build_tenant(), so
+    one tenant's missing secret doesn't stop the others.
+    """
+    with open(path, encoding="utf-8") as fh:
+        config = json.load(fh)
+    tenants = config.get("tenants") or []
+    if not tenants:
+        raise ValueError(f"{path}: no tenants configured")
+    names = set()
+    for index, entry in enumerate(tenants):
+        name = entry.get("name")
+        if not name or not isinstance(name, str):
+            raise ValueError(f"tenant #{index}: missing name")
+        if name in names:
+            raise ValueError(f"tenant '{name}' is configured twice")
+        names.add(name)
+    return config
+
+def resolve_entry(entry):
+    """Validate one tenant entry and return a copy with $ENV references resolved"""
+    name = entry["name"]
+    if not NAME_RX.fullmatch(name):
+        raise ValueError(f"tenant '{name}': name may only contain letters, digits, '_', '-', '@' and '.'")
+    entry = {key: _resolve(value, name, key) for key, value in entry.items()}
+    missing = [key for key in REQUIRED_KEYS if not entry.get(key)]
+    if missing:
+        raise ValueError(f"tenant '{name}': missing {', '.join(missing)}")
+    return entry
+
+def build_tenant(entry, state_dir=None):
+    """Create a sync.Tenant with its own Notion client, rate-limit budget and checkpoint file"""
+    name = entry["name"]
+    state_path = None
+    if state_dir and _flag(entry.get("checkpoint", True)):
+        state_path = os.path.join(state_dir, f"{name}.json")
+    notion = build_notion_client(entry["notion_token"], pool_size=int(entry.get("pool_size", 4)))
+    return sync.Tenant(
+        name,
+        notion,
+        entry["notion_database_id"],
+        entry["imap_user"],
+        entry["imap_pass"],
+        imap_host=entry.get("imap_host", "imap.gmail.com"),
+        imap_folder=entry.get("imap_folder", "INBOX"),
+        date_order=parse_date_order(entry.get("date_order")),
+        rate_limit=float(entry.get("rate_limit", sync.DEFAULT_RATE_LIMIT)),
+        rate_burst=float(entry["rate_burst"]) if entry.get("rate_burst") is not None else None,
+        state_path=state_path,
+    )
+
+def run_tenant(entry, days_back=None, default_days=7, state_dir=None):
+    """Resolve, build and sync one tenant; never raises, errors end up in the returned metrics"""
+    name = entry["name"]
+    metrics = {"tenant": name, "days": days_back, "error": None}
+    tenant = None
+    start = time.perf_counter()
+    try:
+        entry = resolve_entry(entry)
+        metrics["days"] = days_back = days_back or int(entry.get("days", default_days))
+        tenant = build_tenant(entry, state_dir)
+        metrics.update(sync.fetch_recent_emails(tenant, days_back))
+    except Exception as e:
+        metrics["error"] = f"{type(e).__name__}: {e}"
+        log = tenant.log if tenant else lambda *args: print(f"[{name}]", *args)
+        log(f"ERROR: Tenant run failed: {e}")
+        log(f"Traceback: {traceback.format_exc()}")
+    finally:
+        if tenant:
+            tenant.notion.close()
+    metrics["wall_s"] = round(time.perf_counter() - start, 3)
+    metrics["notion_calls"] = tenant.metrics["notion_calls"] if tenant else 0
+    metrics["rate_limit_wait_s"] = round(tenant.limiter.waited, 3) if tenant else 0.0
+    return metrics
+
+def run_all(config, days_back=None, workers=None, only=None, state_dir=None):
+    """Run every configured tenant on a shared pool of worker threads; returns per-tenant metrics"""
+    workers = workers or int(config.get("workers", 4))
+    state_dir = state_dir or config.get("state_dir")
+    default_days = int(config.get("days", 7))
+    entries = [e for e in config["tenants"] if not only or e["name"] in only]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(lambda entry: run_tenant(entry, days_back, default_days, state_dir), entries))
+
+def print_report(results):
+    print("\n" + "="*70)
+    print("MULTI-TENANT SUMMARY")
+    print("="*70)
+    print(f"{'tenant':<16} {'emails':>6} {'upserted':>8} {'failed':>6} {'errors':>6} {'calls':>6} {'rl wait':>8} {'wall':>8}")
+    for r in results:
+        if r["error"]:
+            print(f"{r['tenant']:<16} ❌ {r['error']}")
+            continue
+        print(f"{r['tenant']:<16} {r['total_emails']:>6} {r['successful_upserts']:>8} {r['failed_upserts']:>6} {r['errors']:>6} "
+              f"{r['notion_calls']:>6} {r['rate_limit_wait_s']:>7.1f}s {r['wall_s']:>7.1f}s")
+    print("="*70 + "\n")
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run the Notion Email Bot for many tenants from one process")
+    parser.add_argument("config", help="Tenants config file (JSON)")
+    parser.add_argument("--days", type=int, help="Override every tenant's lookback in days")
+    parser.add_argument("--workers", type=int, help="Tenants processed concurrently (default: config 'workers' or 4)")
+    parser.add_argument("--state-dir", help="Directory for per-tenant checkpoints (default: config 'state_dir')")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="Only run these tenants")
+    parser.add_argument("--report", help="Write per-tenant metrics as JSON to this file")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    results = run_all(config, days_back=args.days, workers=args.workers, only=args.only, state_dir=args.state_dir)
+    print_report(results)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if any(r["error"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+# sync.py
+# Notion upserts and the IMAP processing loop, parameterized by a Tenant so the same
+# code serves bot.py (one tenant from the environment) and runner.py (many tenants
+# from a config file, processed concurrently).
+import os, json, time, imaplib, email, datetime, threading, traceback
+from dates import DEFAULT_DATE_ORDER
+from extraction import extract_record
+
+# Notion allows an average of 3 requests per second per integration
+DEFAULT_RATE_LIMIT = 3.0
+
+# Save the checkpoint after this many messages as well as at the end of a run
+CHECKPOINT_EVERY = 25
+
+class RateLimiter:
+    """Token bucket: `rate` requests per second on average, bursts of up to `burst`"""
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                self.waited += wait
+                time.sleep(wait)
+
+class Tenant:
+    """
+    One mailbox + Notion database, with its own rate-limit budget, status-option
+    (schema) cache, optional IMAP checkpoint and run metrics
+
+    Args:
+        name (str): label for log lines and reports; "" logs without a prefix
+        notion: notion_client.Client authenticated for this tenant
+        state_path (str): JSON checkpoint file; None disables checkpointing
+    """
+
+    def __init__(self, name, notion, database_id, imap_user, imap_pass, imap_host="imap.gmail.com",
+                 imap_folder="INBOX", date_order=DEFAULT_DATE_ORDER, rate_limit=DEFAULT_RATE_LIMIT,
+                 rate_burst=None, state_path=None):
+        self.name = name
+        self.notion = notion
+        self.database_id = database_id
+        self.imap_user = imap_user
+        self.imap_pass = imap_pass
+        self.imap_host = imap_host
+        self.imap_folder = imap_folder
+        self.date_order = date_order
+        self.limiter = RateLimiter(rate_limit, rate_burst)
+        self.state_path = state_path
+        self.status_options = None  # cached "Application Status" options
+        self.metrics = {"notion_calls": 0}
+
+    def log(self, *args):
+        if self.name:
+            print(f"[{self.name}]", *args)
+        else:
+            print(*args)
+
+    def notion_call(self, method, **kwargs):
+        """Call a notion-client endpoint method within this tenant's rate-limit budget"""
+        self.limiter.acquire()
+        self.metrics["notion_calls"] += 1
+        return method(**kwargs)
+
+    def load_checkpoint(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as e:
+            self.log(f"WARNING: Could not read checkpoint {self.state_path}: {e}")
+            return {}
+
+    def save_checkpoint(self, state):
+        if not self.state_path:
+            return
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(state, fh, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+def debug_database_schema(tenant):
+    """Debug function to print the database schema and status options"""
+    try:
+        db_info = tenant.notion_call(tenant.notion.databases.retrieve, database_id=tenant.database_id)
+        tenant.log("=== DATABASE SCHEMA ===")
+        for prop_name, prop_config in db_info["properties"].items():
+            tenant.log(f"Property: '{prop_name}'")
+            tenant.log(f"  Type: {prop_config['type']}")
+            if prop_config['type'] in ['select', 'status']:
+                options = prop_config.get(prop_config['type'], {}).get('options', [])
+                tenant.log(f"  Options: {[opt['name'] for opt in options]}")
+            tenant.log()
+        return db_info
+    except Exception as e:
+        tenant.log(f"Error retrieving database schema: {e}")
+        return None
+
+def get_valid_status_options(tenant):
+    """Get the valid status options from the database (cached per tenant once retrieved)"""
+    if tenant.status_options:
+        return tenant.status_options
+    try:
+        db_info = tenant.notion_call(tenant.notion.databases.retrieve, database_id=tenant.database_id)
+        if not db_info or "properties" not in db_info:
+            tenant.log(f"Warning: Database info missing 'properties' key. Keys: {list(db_info.keys()) if db_info else 'None'}")
+            return []
+
+        status_prop = None
+        for prop_name, prop_config in db_info.get("properties", {}).items():
+            if prop_name == "Application Status" and prop_config.get('type') == 'status':
+                status_prop = prop_config
+                break
+
+        if status_prop:
+            # Handle different possible structures
+            if 'status' in status_prop:
+                options = status_prop.get('status', {}).get('options', [])
+            elif 'options' in status_prop:
+                options = status_prop.get('options', [])
+            else:
+                tenant.log(f"Warning: Status property structure unexpected: {list(status_prop.keys())}")
+                return []
+
+            tenant.status_options = [opt.get('name') for opt in options if isinstance(opt, dict) and 'name' in opt]
+            return tenant.status_options
+        return []
+    except Exception as e:
+        tenant.log(f"Error getting status options: {e}")
+        tenant.log(f"Traceback: {traceback.format_exc()}")
+        return []
+
+def validate_status(tenant, status):
+    """Check if the status is valid and return a valid alternative if not"""
+    valid_options = get_valid_status_options(tenant)
+    if not valid_options:
+        tenant.log("WARNING: Could not retrieve valid status options, using original status")
+        return status
+
+    if status in valid_options:
+        return status
+
+    tenant.log(f"WARNING: Status '{status}' not found in valid options: {valid_options}")
+    # Try to find a close match
+    status_lower = status.lower()
+    for option in valid_options:
+        if status_lower in option.lower() or option.lower() in status_lower:
+            tenant.log(f"Using closest match: '{option}'")
+            return option
+
+    # Default to first available option
+    tenant.log(f"Using default status: '{valid_options[0]}'")
+    return valid_options[0]
+
+def find_existing(tenant, url=None, company=None, role=None, applied_on=None):
+    """Find existing entry by URL, or by company+date combination"""
+    ors = []
+
+    # First priority: exact URL match
+    if url:
+        ors.append({"property": "Application Link / Portal", "url": {"equals": url}})
+
+    # Second priority: company + date combination (most reliable for preventing duplicates)
+    if company and applied_on:
+        ors.append({
+            "and": [
+                {"property": "Company Name", "title": {"equals": company}},
+                {"property": "Application Date", "date": {"equals": applied_on}}
+            ]
+        })
+
+    # Third priority: company + role (only if role is meaningful)
+    if company and role and role not in ["(unknown role)", "unknown role", "role", "position"]:
+        ors.append({
+            "and": [
+                {"property": "Company Name", "title": {"equals": company}},
+                {"property": "Role / Position", "rich_text": {"equals": role}},
+            ]
+        })
+
+    # Fourth priority: just company name (fallback, but less reliable)
+    if company and not ors:
+        ors.append({"property": "Company Name", "title": {"equals": company}})
+
+    if not ors:
+        return None
+
+    try:
+        # Build the filter - use "or" if multiple conditions, otherwise use the single condition
+        if len(ors) > 1:
+            filter_obj = {"or": ors}
+        else:
+            filter_obj = ors[0]
+
+        # Check if query method exists (for compatibility with different versions)
+        if not hasattr(tenant.notion.databases, 'query'):
+            tenant.log("Warning: databases.query() method not available in this version of notion-client")
+            tenant.log("Attempting to use alternative approach...")
+            # Fallback: return None to skip duplicate checking
+            # This means duplicates might be created, but the bot will still work
+            return None
+
+        # Query the database
+        resp = tenant.notion_call(tenant.notion.databases.query, database_id=tenant.database_id, filter=filter_obj)
+
+        if resp and "results" in resp and resp["results"]:
+            return resp["results"][0]["id"]
+        return None
+    except AttributeError as e:
+        # Fallback: try alternative API if query doesn't exist
+        tenant.log(f"Warning: databases.query() not available: {e}")
+        tenant.log("Skipping duplicate check - entries may be created even if duplicates exist")
+        return None
+    except Exception as e:
+        tenant.log(f"Error querying database for existing entry: {e}")
+        tenant.log(f"Traceback: {traceback.format_exc()}")
+        # Don't fail completely - just skip duplicate checking
+        return None
+
+def _write_page(tenant, page_id, props):
+    if page_id:
+        tenant.notion_call(tenant.notion.pages.update, page_id=page_id, properties=props)
+    else:
+        tenant.notion_call(tenant.notion.pages.create, parent={"database_id": tenant.database_id}, properties=props)
+
+def upsert(tenant, company, role, status, url=None, applied_on=None, location=None, notes=None):
+    # Validate and potentially correct the status
+    validated_status = validate_status(tenant, status)
+    tenant.log(f"DEBUG: Original status: '{status}', Validated status: '{validated_status}'")
+
+    props = {
+        "Company Name": {"title": [{"text": {"content": company or "(unknown company)"}}]},
+        "Role / Position": {"rich_text": [{"text": {"content": role or "(unknown role)"}}]},
+        "Application Status": {"status": {"name": validated_status}},
+    }
+    if url:         props["Application Link / Portal"] = {"url": url}
+    if applied_on:  props["Application Date"] = {"date": {"start": applied_on}}
+    if location:    props["Location"] = {"rich_text": [{"text": {"content": location}}]}
+    if notes:       props["Notes"] = {"rich_text": [{"text": {"content": notes[:1900]}}]}
+
+    page_id = find_existing(tenant, url=url, company=company, role=role, applied_on=applied_on)
+    tenant.log(f"DEBUG: Looking for existing entry with company='{company}', role='{role}', applied_on='{applied_on}', url='{url}'")
+    tenant.log(f"DEBUG: Found existing page_id: {page_id}")
+
+    try:
+        _write_page(tenant, page_id, props)
+        return "updated" if page_id else "created"
+    except Exception as e:
+        tenant.log(f"ERROR: Failed to upsert {company=} {role=} {status=}")
+        tenant.log(f"Error details: {e}")
+        # Try with a fallback status if the original status failed
+        if "status" in str(e).lower():
+            fallback_status = validate_status(tenant, "Applied")
+            tenant.log(f"Attempting fallback with status '{fallback_status}'...")
+            props["Application Status"] = {"status": {"name": fallback_status}}
+            try:
+                _write_page(tenant, page_id, props)
+                return "updated (fallback)" if page_id else "created (fallback)"
+            except Exception as e2:
+                tenant.log(f"Fallback also failed: {e2}")
+                return "failed"
+        return "failed"
+
+def _sync_message(tenant, M, uid, stats, costs=None):
+    """Fetch, extract and upsert one message; returns False if it must be retried on the next run"""
+    t0 = time.perf_counter()
+    typ, msg_data = M.uid("fetch", uid, "(RFC822)")
+    fetch_time = time.perf_counter() - t0
+    if typ != "OK" or not msg_data or not isinstance(msg_data[0], tuple):
+        return False
+    raw = msg_data[0][1]
+    t0 = time.perf_counter()
+    msg = email.message_from_bytes(raw)
+    parse_time = time.perf_counter() - t0
+    timings = {} if costs is not None else None
+    record = extract_record(msg, order=tenant.date_order, timings=timings)
+    upsert_time = throttle_time = 0.0
+    handled = True
+    subject, sender = record["subject"], record["sender"]
+    company, role, status = record["company"], record["role"], record["status"]
+    url, applied_on = record["url"], record["applied_on"]
+
+    if record["skip_reason"] == "not_confirmation":
+        # Skip if it's not an application confirmation
+        stats["skipped_not_confirmation"] += 1
+    elif record["skip_reason"] == "non_job_keywords":
+        # Additional filtering - skip if it contains non-job keywords
+        stats["skipped_non_job_keywords"] += 1
+    elif record["skip_reason"] == "no_company":
+        # Skip if we couldn't extract a meaningful company name
+        stats["skipped_no_company"] += 1
+        tenant.log(f"SKIPPED: No meaningful company name extracted")
+        tenant.log(f"  Subject: {subject[:100]}...")
+        tenant.log(f"  Sender: {sender}")
+        tenant.log("---")
+    else:
+        stats["processed"] += 1
+
+        t0, waited0 = time.perf_counter(), tenant.limiter.waited
+        result = upsert(tenant, company, role, status, url=url, applied_on=applied_on, notes=subject)
+        # time asleep in the rate limiter is our own pacing, not Notion's latency
+        throttle_time = tenant.limiter.waited - waited0
+        upsert_time = time.perf_counter() - t0 - throttle_time
+        if "failed" in result:
+            stats["failed_upserts"] += 1
+            handled = False
+        else:
+            stats["successful_upserts"] += 1
+        tenant.log(f"{result}: {company=} {role=} {status=} {url=} {applied_on=}")
+        tenant.log(f"  Subject: {subject[:100]}...")
+        tenant.log(f"  Sender: {sender}")
+        tenant.log("---")
+
+    if costs is not None:
+        costs.add(uid.decode(), msg.get("Message-ID"), len(raw), {
+            "network": fetch_time + upsert_time,
+            "throttle": throttle_time,
+            "mime": parse_time + timings.get("mime", 0.0),
+            "regex": sum(v for k, v in timings.items() if k != "mime"),
+        })
+    return handled
+
+def fetch_recent_emails(tenant, days_back, costs=None):
+    """
+    Fetch and process recent emails for job applications
+
+    Args:
+        tenant (Tenant): mailbox + database to sync
+        days_back (int): Number of days to look back
+        costs (profiling.MessageCosts): if given, per-message network/throttle/MIME/regex time is recorded
+
+    Returns:
+        dict of processing statistics
+
+    With a checkpoint (tenant.state_path), messages up to the last fully synced IMAP
+    UID are skipped, so overlapping lookback windows don't re-upsert old emails. The
+    checkpoint records the SINCE date it covers; a run that looks further back only
+    skips the messages that earlier window contained.
+    """
+    tenant.log(f"DEBUG: IMAP_USER present?", bool(tenant.imap_user))
+    tenant.log(f"DEBUG: IMAP_PASS length:", len(tenant.imap_pass or ""))
+    tenant.log(f"DEBUG: Looking back {days_back} days for emails")
+
+    since = datetime.date.today() - datetime.timedelta(days=days_back)
+    since_date = since.strftime("%d-%b-%Y")
+    tenant.log(f"DEBUG: Searching for emails since {since_date}")
+    M = imaplib.IMAP4_SSL(tenant.imap_host)
+    try:
+        try:
+            M.login(tenant.imap_user, tenant.imap_pass)
+        except imaplib.IMAP4.error as e:
+            tenant.log("ERROR: IMAP authentication failed.")
+            tenant.log("HINT: Ensure IMAP is enabled in Gmail, IMAP_USER matches the account that created the App Password, and IMAP_PASS is the 16-char app password with no spaces.")
+            raise
+        M.select(tenant.imap_folder)
+        uidvalidity = (M.response("UIDVALIDITY")[1] or [None])[0]
+        uidvalidity = uidvalidity.decode() if isinstance(uidvalidity, bytes) else uidvalidity
+        # narrow subjects you care about; edit as you like:
+        search_query = f'(SINCE {since_date})'
+        typ, data = M.uid("search", None, search_query)
+        uids = sorted(data[0].split(), key=int) if data and data[0] else []
+
+        tenant.log(f"INFO: Found {len(uids)} total emails in the last {days_back} days")
+
+        # Resume after the last fully synced message if the mailbox UIDs are still valid
+        checkpoint = tenant.load_checkpoint()
+        synced_uid = 0
+        covered = None  # when looking further back than the checkpoint: UIDs its window contained
+        if (checkpoint.get("uidvalidity") == uidvalidity and checkpoint.get("folder") == tenant.imap_folder
+                and checkpoint.get("since")):
+            synced_uid = int(checkpoint.get("last_uid", 0))
+            checkpoint_since = datetime.date.fromisoformat(checkpoint["since"])
+            if synced_uid and since < checkpoint_since:
+                # UIDs follow arrival order, so older emails below last_uid were never searched
+                typ, data = M.uid("search", None, f'(SINCE {checkpoint_since.strftime("%d-%b-%Y")})')
+                covered = {int(u) for u in data[0].split()} if data and data[0] else set()
+                tenant.log(f"INFO: Checkpoint covers emails since {checkpoint_since}; processing older ones up to UID {synced_uid}")
+            elif synced_uid:
+                tenant.log(f"INFO: Resuming after UID {synced_uid} from checkpoint")
+        # a wider window starts from scratch; the old checkpoint stays until this run gets past it
+        last_uid = synced_uid if covered is None else 0
+
+        def checkpoint_state():
+            if covered is not None and last_uid < synced_uid:
+                return checkpoint
+            return {"uidvalidity": uidvalidity, "folder": tenant.imap_folder, "since": since.isoformat(), "last_uid": last_uid}
+
+        # Statistics tracking
+        stats = {
+            "total_emails": len(uids),
+            "already_synced": 0,
+            "processed": 0,
+            "skipped_not_confirmation": 0,
+            "skipped_non_job_keywords": 0,
+            "skipped_no_company": 0,
+            "successful_upserts": 0,
+            "failed_upserts": 0,
+            "errors": 0
+        }
+
+        # The checkpoint only advances over a contiguous run of handled messages, so a
+        # failed upsert is retried on the next run
+        advance = True
+        try:
+            for count, uid in enumerate(uids, 1):
+                if int(uid) <= synced_uid and (covered is None or int(uid) in covered):
+                    stats["already_synced"] += 1
+                    if advance:
+                        last_uid = max(last_uid, int(uid))
+                    continue
+                try:
+                    handled = _sync_message(tenant, M, uid, stats, costs)
+                except imaplib.IMAP4.abort:
+                    raise  # the connection is gone, nothing more can be fetched
+                except Exception as e:
+                    # one unreadable email must not stop the rest of the mailbox
+                    stats["errors"] += 1
+                    handled = False
+                    tenant.log(f"ERROR: Could not process UID {uid.decode()}: {type(e).__name__}: {e}")
+                    tenant.log(f"Traceback: {traceback.format_exc()}")
+                if not handled:
+                    advance = False
+                if advance:
+                    last_uid = int(uid)
+                    if count % CHECKPOINT_EVERY == 0:
+                        tenant.save_checkpoint(checkpoint_state())
+        finally:
+            # keep the progress made so far even if the run is cut short
+            tenant.save_checkpoint(checkpoint_state())
+
+        # Print statistics summary
+        tenant.log("\n" + "="*70)
+        tenant.log("PROCESSING SUMMARY")
+        tenant.log("="*70)
+        tenant.log(f"Total emails found: {stats['total_emails']}")
+        if stats["already_synced"]:
+            tenant.log(f"⏭️  Already synced (checkpoint): {stats['already_synced']}")
+        tenant.log(f"✅ Processed: {stats['processed']}")
+        tenant.log(f"✅ Successfully upserted: {stats['successful_upserts']}")
+        tenant.log(f"❌ Failed upserts: {stats['failed_upserts']}")
+        if stats["errors"]:
+            tenant.log(f"❌ Failed to process: {stats['errors']}")
+        tenant.log(f"⏭️  Skipped (not application confirmation): {stats['skipped_not_confirmation']}")
+        tenant.log(f"⏭️  Skipped (non-job keywords): {stats['skipped_non_job_keywords']}")
+        tenant.log(f"⏭️  Skipped (no company extracted): {stats['skipped_no_company']}")
+        tenant.log("="*70 + "\n")
+
+        return stats
+    finally:
+        try:
+            M.logout()
+        except Exception:
+            pass